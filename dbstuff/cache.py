@@ -2,17 +2,30 @@
 """
 
 from dbstuff.util import ReadWriteLock
-from weakref import WeakValueDictionary
-from collections import OrderedDict
+from weakref import ref
+from collections import deque
+
+
+class _Node:
+    """A link in LRUCache's intrusive doubly-linked list."""
+
+    __slots__ = ("key", "value", "prev", "next")
+
+    def __init__(self, key=None, value=None):
+        self.key = key
+        self.value = value
+        self.prev = None
+        self.next = None
 
 
 class LRUCache:
     """A Least-Recently-Used cache.
 
     The cache also includes a 'graveyard' of items that have been evicted from
-    the cache. These are stored as weak references throught a
-    `weakref.WeakValueDictionary`. Evicted items can be resurrected if they are
-    retrieved before gc.
+    the cache. These are stored as plain `weakref.ref`s in a bounded dict
+    (oldest dropped first). Evicted items can be resurrected if they are
+    retrieved before gc. Unlike a `weakref.WeakValueDictionary` there is no
+    finalizer callback registered per entry; dead refs are dropped lazily.
 
     I purposely chose to *not* implement __getitem__ and __setitem__ to distance
     this class from builtin dicts and similar objects.
@@ -51,36 +64,69 @@ class LRUCache:
 
     def __init__(self, maxsize):
         self.maxsize = maxsize
-        self.lru = OrderedDict()
-        self.grave = WeakValueDictionary()
+        # the LRU order is an intrusive doubly-linked list threaded
+        # through _Nodes (most recent at the head, eviction candidates
+        # at the tail), with a dict for O(1) access by key. one hash
+        # lookup and four pointer writes per touch, versus OrderedDict's
+        # dual bookkeeping.
+        self._head = _Node()
+        self._tail = _Node()
+        self._head.next = self._tail
+        self._tail.prev = self._head
+        self._map = {}
+        # key -> weakref.ref of evicted values, oldest first.
+        self.grave = {}
         self.hits = 0
         self.misses = 0
         self.resurrections = 0
         self.rwlock = ReadWriteLock()
+        # keys hit since the last write, waiting to be moved to the
+        # recently-used end. deque appends are atomic, so readers can
+        # record a hit without taking the write lock.
+        self._recent = deque(maxlen=128)
 
     def get(self, key, default=None):
         """Retrieve an item from the cache if it exists.
 
+        The LRU reorder is lazy: hits are only noted here, and the next
+        `set` replays them under the write lock. `move_to_end` on every
+        get was both the main point of contention for read-heavy use and
+        a mutation we had no business doing under the read lock.
+
         :param key: The key to retrieve.
         :param default: The default value to return if the item doesn't exist.
         :return: The value associated with key.
         """
 
         with self.rwlock.read_access:
-            try:
-                value = self.lru[key]
+            node = self._map.get(key)
+            if node is not None:
                 self.hits += 1
-            except KeyError:
-                # try to resurrect
-                value = self.grave.pop(key, None)
-                if value is not None:
-                    self.lru[key] = value
-                    self.resurrections += 1
-                else:
-                    self.misses += 1
-                    return default
-
-            self.lru.move_to_end(key)
+                self._recent.append(key)
+                return node.value
+
+        # try to resurrect. this mutates the graveyard, the map, and
+        # the linked list, so it must not happen under the shared read
+        # lock -- two readers interleaving _push_front would corrupt
+        # the list.
+        with self.rwlock.write_access:
+            # re-check: a writer may have inserted the key while we
+            # were between the locks.
+            node = self._map.get(key)
+            if node is not None:
+                self.hits += 1
+                self._recent.append(key)
+                return node.value
+
+            wr = self.grave.pop(key, None)
+            value = wr() if wr is not None else None
+            if value is None:
+                self.misses += 1
+                return default
+            node = _Node(key, value)
+            self._map[key] = node
+            self._push_front(node)
+            self.resurrections += 1
         return value
 
     def set(self, key, value):
@@ -90,18 +136,43 @@ class LRUCache:
         :param value: The value to store.
         """
         with self.rwlock.write_access:
+            # replay the reorders the read path deferred.
+            while self._recent:
+                node = self._map.get(self._recent.popleft())
+                if node is not None:
+                    self._unlink(node)
+                    self._push_front(node)
+
             if key in self.grave:
                 del self.grave[key]
 
-            if key in self.lru:
-                self.lru.move_to_end(key)
-            self.lru[key] = value
+            node = self._map.get(key)
+            if node is not None:
+                node.value = value
+                self._unlink(node)
+            else:
+                node = _Node(key, value)
+                self._map[key] = node
+            self._push_front(node)
 
-            while len(self.lru) > self.maxsize:
+            while len(self._map) > self.maxsize:
                 # remove old items from the cache
                 # send them to live with the dead
-                (k, v) = self.lru.popitem(last=False)
-                self.grave[k] = v
+                old = self._tail.prev
+                self._unlink(old)
+                del self._map[old.key]
+                self._bury(old.key, old.value)
+
+    def _bury(self, key, value):
+        """Put a weak reference to an evicted value in the graveyard."""
+        while len(self.grave) >= self.maxsize:
+            del self.grave[next(iter(self.grave))]
+        try:
+            self.grave[key] = ref(value)
+        except TypeError:
+            # not everything is weak-referenceable (bytes, ints, ...);
+            # those values simply stay dead.
+            pass
 
     def delete(self, key):
         """Remove a value from the cache.
@@ -113,5 +184,72 @@ class LRUCache:
         with self.rwlock.write_access:
             if key in self.grave:
                 del self.grave[key]
-            if key in self.lru:
-                del self.lru[key]
+            node = self._map.pop(key, None)
+            if node is not None:
+                self._unlink(node)
+
+    def _unlink(self, node):
+        node.prev.next = node.next
+        node.next.prev = node.prev
+
+    def _push_front(self, node):
+        node.prev = self._head
+        node.next = self._head.next
+        node.prev.next = node
+        node.next.prev = node
+
+
+class ShardedLRUCache:
+    """An LRUCache split into independently locked shards.
+
+    A single `LRUCache` funnels every caller through one lock, which is
+    the bottleneck under many-thread access. Keys are spread over
+    `shards` plain LRUCaches by hash, so threads touching different
+    shards never contend.
+
+    :param maxsize: The maximum number of items across all shards.
+    :param shards: The number of shards. Must be a power of two so the
+        shard index is a cheap mask of the hash.
+
+    >>> c = ShardedLRUCache(maxsize=32, shards=4)
+    >>> c.set('a', 1)
+    >>> c.get('a')
+    1
+    >>> (c.hits, c.misses)
+    (1, 0)
+    """
+
+    def __init__(self, maxsize, shards=16):
+        if shards < 1 or shards & (shards - 1):
+            raise ValueError("shards must be a positive power of two")
+        self._mask = shards - 1
+        self._shards = [
+            LRUCache(max(1, maxsize // shards)) for _ in range(shards)
+        ]
+
+    def _shard(self, key):
+        return self._shards[hash(key) & self._mask]
+
+    def get(self, key, default=None):
+        """Retrieve an item from whichever shard owns `key`."""
+        return self._shard(key).get(key, default)
+
+    def set(self, key, value):
+        """Add a value to whichever shard owns `key`."""
+        self._shard(key).set(key, value)
+
+    def delete(self, key):
+        """Remove `key` from its shard, if present."""
+        self._shard(key).delete(key)
+
+    @property
+    def hits(self):
+        return sum(s.hits for s in self._shards)
+
+    @property
+    def misses(self):
+        return sum(s.misses for s in self._shards)
+
+    @property
+    def resurrections(self):
+        return sum(s.resurrections for s in self._shards)
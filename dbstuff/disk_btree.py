@@ -4,43 +4,78 @@ BPlusTree stored on disk.
 
 
 from __future__ import annotations
+import sys
+from array import array
 from bisect import bisect_left, bisect_right
 from math import ceil
 from typing import Generic, List, Optional, Tuple, TypeVar
-from dbstuff.util import Entry, split_list
 from dbstuff.pager import Pager
-from enum import Enum
 
 
 # These are the signals returned by child nodes after performing an operation.
 # REBALANCE on insert means the child is too full.
 # REBALANCE on delete means the child is too empty.
-class ChildStatus(Enum):
-    DONE = "DONE"
-    REBALANCE = "REBALANCE"
+# Plain bools so callers can branch on `if result:` directly.
+DONE = False
+REBALANCE = True
 
 
 K = TypeVar("K")  # key
 V = TypeVar("V")  # value
 
+# marker for "not in the hot-key cache" (None is a legitimate result).
+_MISSING = object()
+
+
+def _chunks(seq: list, cap: int, lo: int):
+    """Yield runs of `seq` holding at most `cap` items each.
+
+    When the final run would come up short, the run before it gives up
+    items to bring it to `lo`. That only guarantees the *final* run:
+    if the remainder is larger than `cap` but smaller than `2 * lo`,
+    no cut into two runs of `lo` each exists, and the donating run
+    itself ends up short. bulk_load tolerates the occasional
+    undersized node; deletes rebalance it like any other.
+    """
+    n = len(seq)
+    start = 0
+    while start < n:
+        size = min(cap, n - start)
+        if 0 < n - start - size < lo:
+            size = n - start - lo
+        yield seq[start : start + size]
+        start += size
+
 
 class BPlusTree(Generic[K, V]):
 
-    def __init__(self, order: int, pager: Pager):
+    def __init__(self, order: int, pager: Pager, key_typecode=None):
         if order < 3:
             raise ValueError("BPlusTree order must be >= 3")
         self.ORDER = order
+        self.key_typecode = key_typecode
         self.MAX_KEYS = self.ORDER - 1
         self.MIN_KEYS = ceil(self.MAX_KEYS / 2)
 
         self.root = InteriorNode(self)
         self.root.children = [LeafNode(self, None, None)]
 
+        # front-cache of recently fetched keys. real workloads are
+        # skewed, and a hit here skips the whole descent.
+        self._hot = {}
+        self._hot_cap = 256
+
+    def _new_keys(self, items=()):
+        """A fresh key container, optionally filled from `items`."""
+        if self.key_typecode is None:
+            return list(items)
+        return array(self.key_typecode, items)
+
     @property
     def first_leaf(self):
         """The leaf with the smallest keys."""
         node = self.root
-        while isinstance(node, InteriorNode):
+        while not node.is_leaf:
             node = node.children[0]
         return node
 
@@ -48,103 +83,227 @@ class BPlusTree(Generic[K, V]):
     def last_leaf(self):
         """The leaf with the largest keys."""
         node = self.root
-        while isinstance(node, InteriorNode):
+        while not node.is_leaf:
             node = node.children[-1]
         return node
 
+    def _find_leaf(self, key: K) -> LeafNode[K, V]:
+        """Walk down to the leaf that would contain `key`.
+
+        Iterative on purpose: recursing through the nodes costs a Python
+        frame per level.
+        """
+        node = self.root
+        # bound locally: LOAD_FAST instead of LOAD_GLOBAL per level.
+        search = bisect_right
+        while not node.is_leaf:
+            node = node.children[search(node.keys, key)]
+        return node
+
+    def _find_path(self, key: K):
+        """Like `_find_leaf`, but also collect the (parent, child index)
+        pairs visited on the way down so writes can unwind them."""
+        path = []
+        append = path.append
+        node = self.root
+        search = bisect_right
+        while not node.is_leaf:
+            i = search(node.keys, key)
+            append((node, i))
+            node = node.children[i]
+        return node, path
+
     def __setitem__(self, key: K, value: V):
-        result = self.root.insert(key, value)
-        if result == ChildStatus.REBALANCE:
+        self._hot.pop(key, None)
+        leaf, path = self._find_path(key)
+        result = leaf.insert(key, value)
+
+        # unwind the path, splitting any child that grew too full.
+        child = leaf
+        for parent, i in reversed(path):
+            if not result:
+                return
+            median, right_child = child.split()
+            parent.keys.insert(i, median)
+            parent.children.insert(i + 1, right_child)
+            result = len(parent.keys) > self.MAX_KEYS
+            child = parent
+
+        if result:
             median, right_child = self.root.split()
             new_root = InteriorNode(self)
-            new_root.keys = [median]
+            new_root.keys.append(median)
             new_root.children = [self.root, right_child]
             self.root = new_root
 
     def __getitem__(self, key: K) -> Optional[V]:
-        dummy = Entry(key, None)
-        leaf = self.root.find_leaf(key)
-        if dummy in leaf.entries:
-            i = leaf.entries.index(dummy)
-            return leaf.entries[i].value
-        return None
+        value = self._hot.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        leaf = self._find_leaf(key)
+        i = bisect_left(leaf.keys, key)
+        if i < len(leaf.keys) and leaf.keys[i] == key:
+            value = leaf.values[i]
+        else:
+            value = None
+
+        if len(self._hot) >= self._hot_cap:
+            # FIFO eviction: dicts keep insertion order.
+            del self._hot[next(iter(self._hot))]
+        self._hot[key] = value
+        return value
 
     def __contains__(self, key: K) -> bool:
-        dummy = Entry(key, None)
-        leaf = self.root.find_leaf(key)
-        return dummy in leaf.entries
+        leaf = self._find_leaf(key)
+        i = bisect_left(leaf.keys, key)
+        return i < len(leaf.keys) and leaf.keys[i] == key
 
     def __delitem__(self, key: K):
-        self.root.delete(key)
-        if len(self.root.keys) == 0 and isinstance(
-            self.root.children[0], InteriorNode
-        ):
+        self._hot.pop(key, None)
+        leaf, path = self._find_path(key)
+        result = leaf.delete(key)
+
+        # unwind the path, rebalancing any child that grew too empty.
+        for parent, i in reversed(path):
+            if not result:
+                break
+            parent.rebalance_after_delete(i)
+            result = len(parent.keys) < self.MIN_KEYS
+
+        if len(self.root.keys) == 0 and not self.root.children[0].is_leaf:
             self.root = self.root.children[0]
 
-    def show(self):
-        self.root.show()
+    def update(self, pairs):
+        """Insert many (key, value) pairs in one call.
+
+        Later duplicates win, like repeated assignment. Into an empty
+        tree this defers to `bulk_load` -- one O(N) bottom-up build
+        instead of N descents. Otherwise pairs are applied in sorted
+        order, so consecutive inserts revisit the same leaves while
+        they're hot.
+        """
+        pairs = sorted(dict(pairs).items())
+        root = self.root
+        if not root.keys and not root.children[0].keys:
+            self.bulk_load(pairs)
+            return
+        for key, value in pairs:
+            self[key] = value
+
+    def bulk_load(self, items):
+        """Build the tree bottom-up from key-sorted (key, value) pairs.
+
+        Replaces the current contents. Leaves are filled left to right
+        and the interior levels are stacked on top a layer at a time, so
+        loading N pairs is O(N) -- no descents, splits, or rebalances.
+        """
+        pairs = list(items)
+        self._hot.clear()
+
+        if not pairs:
+            self.root = InteriorNode(self)
+            self.root.children = [LeafNode(self, None, None)]
+            return
+
+        # build the linked leaf level.
+        leaves = []
+        prev = None
+        for group in _chunks(pairs, self.MAX_KEYS, self.MIN_KEYS):
+            leaf = LeafNode(self, prev, None)
+            leaf.keys = self._new_keys(k for k, _ in group)
+            leaf.values = [v for _, v in group]
+            if prev is not None:
+                prev.next_leaf = leaf
+            prev = leaf
+            leaves.append(leaf)
+
+        # stack interior levels until one node remains. `low_keys[i]` is
+        # the smallest key under level[i]; it becomes the separator in
+        # front of that child.
+        level = leaves
+        low_keys = [leaf.keys[0] for leaf in leaves]
+        while len(level) > 1:
+            parents = []
+            parent_low = []
+            pairs = list(zip(level, low_keys))
+            for group in _chunks(pairs, self.ORDER, self.MIN_KEYS + 1):
+                node = InteriorNode(self)
+                node.children = [child for child, _ in group]
+                node.keys = self._new_keys(low for _, low in group[1:])
+                parents.append(node)
+                parent_low.append(group[0][1])
+            level = parents
+            low_keys = parent_low
+
+        root = level[0]
+        if root.is_leaf:
+            # keep the invariant from __init__: the root is always an
+            # InteriorNode, even over a single leaf.
+            new_root = InteriorNode(self)
+            new_root.children = [root]
+            root = new_root
+        self.root = root
+
+    def show(self, out=None):
+        """Write a dump of the tree, one node per line.
+
+        The lines are joined and written in one call: printing per node
+        meant one flushed write per node, which swamps everything else
+        when dumping a big tree.
+        """
+        if out is None:
+            out = sys.stdout
+        lines = []
+        stack = [(self.root, 0)]
+        while stack:
+            node, level = stack.pop()
+            if node.is_leaf:
+                items = list(zip(node.keys, node.values))
+                lines.append(f"{'  ' * level} {items}")
+            else:
+                lines.append(f"{'  ' * level} => {node.keys}")
+                stack.extend(
+                    (c, level + 1) for c in reversed(node.children)
+                )
+        out.write("\n".join(lines) + "\n")
 
 
 class InteriorNode(Generic[K, V]):
     """A B+-tree interior (non-leaf) node."""
 
+    is_leaf = False
+
+    # no per-instance __dict__: a big tree has a lot of nodes, and the
+    # dict costs more memory than the node's actual payload.
+    __slots__ = ("tree", "_max", "_min", "keys", "children")
+
     def __init__(self, tree: BPlusTree[K, V]):
         self.tree = tree
-        self.keys: List[K] = []
+        # cached locally: self.tree.MAX_KEYS is two attribute loads on
+        # every node operation.
+        self._max = tree.MAX_KEYS
+        self._min = tree.MIN_KEYS
+        self.keys = tree._new_keys()
         self.children = []
 
-    def show(self, level=0):
-        print("  " * level, "=>", self.keys)
-        for c in self.children:
-            c.show(level + 1)
-
-    def find_leaf(self, key: K) -> LeafNode:
-        ii = -1
-        for i, k in enumerate(self.keys):
-            if key < k:
-                ii = i
-                break
-        return self.children[ii].find_leaf(key)
-
     def split(self) -> Tuple[K, InteriorNode[K, V]]:
         """creates a new right sibling and moves half the keys over"""
-        assert len(self.keys) == self.tree.MAX_KEYS + 1
+        assert len(self.keys) == self._max + 1
         right_sib = InteriorNode(self.tree)
-        median = self.keys.pop(ceil(len(self.keys) / 2 - 1))
-        self.keys, right_sib.keys = split_list(self.keys)
-        self.children, right_sib.children = split_list(self.children)
+        # one pass over each list: popping the median first would shift
+        # everything after it, only for the slicing to move half of the
+        # list again.
+        mid = (len(self.keys) + 1) // 2 - 1
+        median = self.keys[mid]
+        right_sib.keys = self.keys[mid + 1 :]
+        del self.keys[mid:]
+        right_sib.children = self.children[mid + 1 :]
+        del self.children[mid + 1 :]
         assert len(self.keys) + 1 == len(self.children)
         assert len(right_sib.keys) + 1 == len(right_sib.children)
         return median, right_sib
 
-    def insert(self, key: K, value: V) -> ChildStatus:
-        i = bisect_right(self.keys, key)
-        child = self.children[i]
-        result = child.insert(key, value)
-
-        if result == ChildStatus.REBALANCE:
-            median, right_child = child.split()
-            self.keys.insert(i, median)
-            self.children.insert(i + 1, right_child)
-
-            if len(self.keys) > self.tree.MAX_KEYS:
-                return ChildStatus.REBALANCE
-
-        return ChildStatus.DONE
-
-    def delete(self, key: K) -> ChildStatus:
-        # which index to descend?
-        i = bisect_right(self.keys, key)
-        child = self.children[i]
-
-        # delete from child tree and see what we need to do.
-        result = child.delete(key)
-        if result == ChildStatus.REBALANCE:
-            self.rebalance_after_delete(i)
-            if len(self.keys) < self.tree.MIN_KEYS:
-                return ChildStatus.REBALANCE
-        return ChildStatus.DONE
-
     def rebalance_after_delete(self, i: int):
         """Rebalance child `i` after a deletion
 
@@ -236,11 +395,21 @@ class InteriorNode(Generic[K, V]):
         return self
 
     def is_minimal(self) -> bool:
-        return len(self.keys) <= self.tree.MIN_KEYS
+        return len(self.keys) <= self._min
 
 
 class LeafNode(Generic[K, V]):
-    """A B+-tree leaf node containing keys and data."""
+    """A B+-tree leaf node containing keys and data.
+
+    Keys and values live in parallel sequences (structure-of-arrays):
+    searches bisect a plain list of keys -- dense, comparable data with
+    no Entry objects to chase -- and only a hit touches `values`.
+    """
+
+    is_leaf = True
+
+    __slots__ = ("tree", "_max", "_min", "prev_leaf", "next_leaf",
+                 "keys", "values")
 
     def __init__(
         self,
@@ -249,15 +418,12 @@ class LeafNode(Generic[K, V]):
         next_leaf: Optional[LeafNode[K, V]],
     ):
         self.tree = tree
+        self._max = tree.MAX_KEYS
+        self._min = tree.MIN_KEYS
         self.prev_leaf = prev_leaf
         self.next_leaf = next_leaf
-        self.entries: List[Entry[K, V]] = []
-
-    def show(self, level=0):
-        print("  " * level, self.entries)
-
-    def find_leaf(self, _key: K) -> LeafNode[K, V]:
-        return self
+        self.keys = tree._new_keys()
+        self.values: List[V] = []
 
     def split(self) -> Tuple[K, LeafNode[K, V]]:
         """creates a new right sibling and moves half its keys over"""
@@ -266,11 +432,15 @@ class LeafNode(Generic[K, V]):
             right_sib.next_leaf.prev_leaf = right_sib
         self.next_leaf = right_sib
 
-        self.entries, right_sib.entries = split_list(self.entries)
-        median = right_sib.entries[0].key
+        mid = len(self.keys) // 2
+        right_sib.keys = self.keys[mid:]
+        del self.keys[mid:]
+        right_sib.values = self.values[mid:]
+        del self.values[mid:]
+        median = right_sib.keys[0]
         return median, right_sib
 
-    def insert(self, key: K, value: V) -> ChildStatus:
+    def insert(self, key: K, value: V) -> bool:
         """
         Insert the key and value into this leaf.
         Notify the parent of the result.
@@ -279,36 +449,36 @@ class LeafNode(Generic[K, V]):
             2. Split
         """
 
-        e = Entry(key, value)
-        i = bisect_left(self.entries, e)
+        i = bisect_left(self.keys, key)
 
-        if e in self.entries:
-            # replace the old entry
-            self.entries[i] = e
+        if i < len(self.keys) and self.keys[i] == key:
+            # replace the old value
+            self.values[i] = value
         else:
-            # insert the entry
-            self.entries.insert(i, e)
+            # insert the new pair
+            self.keys.insert(i, key)
+            self.values.insert(i, value)
 
-        if len(self.entries) > self.tree.MAX_KEYS:
-            return ChildStatus.REBALANCE
+        if len(self.keys) > self._max:
+            return REBALANCE
 
         # inserted without a problem
-        return ChildStatus.DONE
+        return DONE
 
-    def delete(self, key: K) -> ChildStatus:
+    def delete(self, key: K) -> bool:
         """
         Remove the entry given by key
         If we're deficient, signal to the parent by returning
         REBALANCE
         """
-        dummy = Entry(key, None)
-        i = bisect_left(self.entries, dummy)
+        i = bisect_left(self.keys, key)
 
-        if self.entries[i] == dummy:
-            del self.entries[i]
-            if len(self.entries) < self.tree.MIN_KEYS:
-                return ChildStatus.REBALANCE
-        return ChildStatus.DONE
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+            del self.values[i]
+            if len(self.keys) < self._min:
+                return REBALANCE
+        return DONE
 
     def borrow_right(self, _median: K, right_sib: LeafNode[K, V]) -> K:
         """
@@ -318,9 +488,9 @@ class LeafNode(Generic[K, V]):
         assert self.next_leaf == right_sib
         assert right_sib.prev_leaf == self
 
-        e = right_sib.entries.pop(0)
-        self.entries.append(e)
-        return right_sib.entries[0].key
+        self.keys.append(right_sib.keys.pop(0))
+        self.values.append(right_sib.values.pop(0))
+        return right_sib.keys[0]
 
     def borrow_left(self, _median: K, left_sib: LeafNode[K, V]) -> K:
         """
@@ -330,9 +500,9 @@ class LeafNode(Generic[K, V]):
         assert left_sib.next_leaf == self
         assert self.prev_leaf == left_sib
 
-        e = left_sib.entries.pop()
-        self.entries.insert(0, e)
-        return self.entries[0].key
+        self.keys.insert(0, left_sib.keys.pop())
+        self.values.insert(0, left_sib.values.pop())
+        return self.keys[0]
 
     def merge(self, _median: K, right_sib: LeafNode[K, V]) -> LeafNode[K, V]:
         """
@@ -342,11 +512,12 @@ class LeafNode(Generic[K, V]):
         assert self.next_leaf == right_sib
         assert right_sib.prev_leaf == self
 
-        self.entries.extend(right_sib.entries)
+        self.keys.extend(right_sib.keys)
+        self.values.extend(right_sib.values)
         self.next_leaf = right_sib.next_leaf
         if self.next_leaf:
             self.next_leaf.prev_leaf = self
         return self
 
     def is_minimal(self) -> bool:
-        return len(self.entries) <= self.tree.MIN_KEYS
+        return len(self.keys) <= self._min
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import Any, Mapping
 from collections import OrderedDict
 from struct import Struct
@@ -13,18 +14,18 @@ class FieldType:
     def __init__(self, count: int = 1, /, default=None):
         self.count: int = count
         self.default: Any = default
+        # count and CODE never change, so build the format fragment once.
+        self._str = self.CODE if count == 1 else f"{count}{self.CODE}"
 
     def __str__(self):
-        if self.count == 1:
-            return self.CODE
-        return str(self.count) + self.CODE
+        return self._str
 
 
 CODES: Mapping[str, FieldType] = {}
 
 
 def make_field_type(name, code):
-    typ = type(name, (FieldType,), {"CODE": k})
+    typ = type(name, (FieldType,), {"CODE": code})
     CODES[code] = typ
     return typ
 
@@ -38,10 +39,15 @@ Int = make_field_type('Int', 'i')
 UInt = make_field_type('UInt', 'I')
 
 
+@lru_cache(maxsize=None)
+def _field_from_code(code: str) -> FieldType:
+    # TODO: parse out the count if there is one
+    return CODES[code]()
+
+
 def normalize_field(field):
     if isinstance(field, str):
-        # TODO: parse out the count if there is one
-        return CODES[field]()
+        return _field_from_code(field)
     elif isinstance(field, FieldType):
         return field
     raise ValueError("Bad field type")
@@ -52,6 +58,13 @@ class NamedStruct:
     struct_format: str
     struct: Struct
 
+    # `pack`/`unpack`/`size` are bound per subclass in __init_subclass__
+    # so calls go straight to the compiled Struct methods with no
+    # property or method dispatch in between.
+    pack: Any
+    unpack: Any
+    size: int
+
     def __init_subclass__(cls, byteorder="", **kwargs) -> None:
         fields = OrderedDict()
         struct_format = [byteorder]
@@ -61,29 +74,12 @@ class NamedStruct:
                 fields[name] = field
                 setattr(cls, name, field)
                 struct_format.append(str(field))
+        compiled = Struct("".join(struct_format))
         setattr(cls, "__fields", fields)
-        setattr(cls, "struct_format", "".join(struct_format))
-        setattr(cls, "struct", Struct(struct_format))
+        setattr(cls, "struct_format", compiled.format)
+        setattr(cls, "struct", compiled)
+        # FIXME: unpack should maybe return an instance of NamedStruct
+        setattr(cls, "pack", compiled.pack)
+        setattr(cls, "unpack", compiled.unpack)
+        setattr(cls, "size", compiled.size)
         super().__init_subclass__(**kwargs)
-
-    @classmethod
-    def unpack(cls, data):
-        # FIXME: this should return an instance of NamedStruct
-
-        return cls.struct.unpack(data)
-
-    def pack(self, *args) -> bytes:
-        return self.struct.pack(*args)
-
-    @property
-    def size(self):
-        return self.struct.size()
-
-
-class MyStruct(NamedStruct, byteorder="!"):
-    barf = "x"
-    something = Byte(24)
-    what = Padding(5)
-
-
-print(MyStruct.struct_format)
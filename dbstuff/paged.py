@@ -45,22 +45,65 @@ OverflowPage `Struct('!BI4091B')`:
     u8[4091] data
 """
 
+from __future__ import annotations
+
+import sys
 from array import ArrayType, array
-from named_struct import NamedStruct, UShort, UByte, UInt
+from bisect import bisect_right
+from functools import lru_cache
+from struct import Struct
+from typing import List
+
+
+_U64 = Struct("!Q")
 
 
 def bytes2u64(b: bytes) -> int:
+    """Convert up to 8 bytes into a big-endian u64.
+
+    Exactly 8 bytes — the common case for key slices — unpacks directly;
+    shorter input pays for the zero-padding copy.
+    """
+    if len(b) == 8:
+        return _U64.unpack(b)[0]
     if len(b) > 8:
         raise ValueError("can only convert bytes of length 8 to an int.")
-    return int.from_bytes(b.ljust(8, b"\0"), "big", signed=False)
+    return _U64.unpack(b.ljust(8, b"\0"))[0]
+
+
+@lru_cache(maxsize=None)
+def _slice_struct(n: int) -> Struct:
+    """A compiled `!nQ` format, one per slice count."""
+    return Struct(f"!{n}Q")
 
 
 def slice_key(k: str) -> ArrayType[int]:
+    """Split a key into big-endian u64 slices.
+
+    The whole key is unpacked with a single (cached) Struct call rather
+    than converting one 8-byte window per loop iteration.
+    """
     b = k.encode("utf-8")
-    slices = array("Q")
-    for i in range(0, len(b), 8):
-        slices.append(bytes2u64(b[i : i + 8]))
-    return slices
+    n = (len(b) + 7) // 8
+    if n == 0:
+        return array("Q")
+    return array("Q", _slice_struct(n).unpack(b.ljust(n * 8, b"\0")))
+
+
+def cmp_slices(a, b) -> int:
+    """Compare two sliced keys; returns -1, 0, or 1.
+
+    Because slices are big-endian u64 words, comparing the word
+    sequences orders the same way as comparing the padded key bytes —
+    but each step of the comparison handles 8 bytes at once. Arrays of
+    the same typecode compare lexicographically in C, so the arguments
+    are compared directly; no tuple round-trip.
+    """
+    if a < b:
+        return -1
+    if b < a:
+        return 1
+    return 0
 
 
 class PagedNode:
@@ -71,75 +114,143 @@ class PagedNode:
 
 PAGE_SIZE = 4096
 
+
+def _swapped(a: ArrayType[int]) -> ArrayType[int]:
+    """A copy of `a` in big-endian byte order (on big-endian hosts, `a`
+    itself)."""
+    if sys.byteorder == "big":
+        return a
+    a = array(a.typecode, a)
+    a.byteswap()
+    return a
+
+
 class InteriorNode:
-    # New style:
-    # Interior nodes have a header and a payload.
-    # the payload will not have a fixed format and will need to be parsed out
-    # as the node can have a variable number of keys with variable lengths.
+    """An interior node in the fixed page layout from the module
+    docstring:
 
-    HEADER_SIZE = 5
-    MAX_WEIGHT = PAGE_SIZE - HEADER_SIZE
+        u8       page type (0x01)
+        u16      number of keys
+        u8[5]    padding
+        u64[340] key_slices
+        u32[341] child_pagenos
+        u8[4]    padding
 
-    class PageFormat(NamedStruct, byteorder='!'):
-        magic = UShort()
-        page_type = UByte(default=1)
-        weight = UShort()
-        payload = UByte(PAGESIZE - 5)
+    The node is backed by its page image: a single 4 KiB buffer that
+    fields are read from and written to in place, so there is no
+    unpack-into-objects / repack-on-write cycle at all.
+    """
 
-    def __init__(self, keys: List[bytes], children: List[int]):
-        assert len(children) == len(keys) + 1
-        self.keys = keys
-        self.children = children
+    PAGE_TYPE = 0x01
+    MAX_KEYS = 340
+    MAX_CHILDREN = MAX_KEYS + 1
+    HEADER = Struct("!BH5x")
+    KEYS_OFFSET = HEADER.size
+    CHILDREN_OFFSET = KEYS_OFFSET + 8 * MAX_KEYS
+    assert CHILDREN_OFFSET + 4 * MAX_CHILDREN + 4 == PAGE_SIZE
+
+    _NKEYS = Struct("!H")
+    _KEY = Struct("!Q")
+    _CHILD = Struct("!I")
+
+    def __init__(self, key_slices=(), child_pagenos=(), buf=None):
+        if buf is None:
+            buf = bytearray(PAGE_SIZE)
+            buf[0] = self.PAGE_TYPE
+        self._buf = buf
+        # decoded key slices, built on first search and dropped on edit.
+        self._key_cache = None
+        if key_slices or child_pagenos:
+            keys = _swapped(array("Q", key_slices)).tobytes()
+            self._buf[self.KEYS_OFFSET : self.KEYS_OFFSET + len(keys)] = keys
+            children = _swapped(array("I", child_pagenos)).tobytes()
+            self._buf[
+                self.CHILDREN_OFFSET : self.CHILDREN_OFFSET + len(children)
+            ] = children
+            self.nkeys = len(key_slices)
 
     @property
-    def weight(self):
-        w = 0
-        for k in keys:
-            w += len(k)
-        w += 4 * len(children)
-        return w
+    def nkeys(self) -> int:
+        return self._NKEYS.unpack_from(self._buf, 1)[0]
 
-    @staticmethod
-    def from_page(page_data):
-        PageFormat.unpack(page_data)
+    @nkeys.setter
+    def nkeys(self, n: int):
+        self._NKEYS.pack_into(self._buf, 1, n)
+        self._key_cache = None
 
+    def key_slice(self, i: int) -> int:
+        return self._KEY.unpack_from(self._buf, self.KEYS_OFFSET + 8 * i)[0]
 
-"""
-class InteriorNode:
-    \"""
-    Interior page
-      uint16_t      MAGIC
-      uint8_t       page type (1 for interior nodes)
-      uint8_t       Number of keys
-      uint8_t[4]    zero
-      uint64_t[255] key_slices
-      uint64_t[256] child_pointers
-    \"""
-
-    page_format = Struct("!HBBxxxx255Q256Q")
-    assert page_format.size == 4096, "InteriorNode doesn't fit in a page."
-    MAGIC = 0x4447
-    PAGE_TYPE = 0x01
+    def set_key_slice(self, i: int, value: int):
+        self._KEY.pack_into(self._buf, self.KEYS_OFFSET + 8 * i, value)
+        self._key_cache = None
+
+    def child_pageno(self, i: int) -> int:
+        return self._CHILD.unpack_from(
+            self._buf, self.CHILDREN_OFFSET + 4 * i
+        )[0]
+
+    def set_child_pageno(self, i: int, value: int):
+        self._CHILD.pack_into(self._buf, self.CHILDREN_OFFSET + 4 * i, value)
 
-    def __init__(self):
-        self.nkeys = 0
-        self.key_slices = array("Q")
-        self.child_pointers = array("Q")
-
-    def pack(self):
-        b = self.page_format.pack(
-            self.MAGIC,
-            self.PAGE_TYPE,
-            self.nkeys,
-            *self.key_slices,
-            *([0] * (255 - len(self.key_slices))),
-            *self.child_pointers,
-            *([0] * (256 - len(self.child_pointers))),
+    @property
+    def key_slices(self) -> ArrayType[int]:
+        keys = array("Q")
+        keys.frombytes(
+            bytes(self._buf[self.KEYS_OFFSET : self.KEYS_OFFSET + 8 * self.nkeys])
         )
-        assert len(b) == 4096
-        return b
+        return _swapped(keys)
+
+    @property
+    def child_pagenos(self) -> ArrayType[int]:
+        children = array("I")
+        end = self.CHILDREN_OFFSET + 4 * (self.nkeys + 1)
+        children.frombytes(bytes(self._buf[self.CHILDREN_OFFSET : end]))
+        return _swapped(children)
 
+    def _keys_tuple(self) -> tuple:
+        if self._key_cache is None:
+            self._key_cache = tuple(self.key_slices)
+        return self._key_cache
 
-# print(slice_key('Hello, World!'))
-# InteriorNode().pack()
-"""
+    def find_child(self, key_slice: int) -> int:
+        """The child pageno to descend into for `key_slice`.
+
+        bisect runs over a cached tuple of this node's key slices, so
+        the buffer is decoded once per generation of edits rather than
+        once per probed key, and the search itself is a C routine.
+        """
+        return self.child_pageno(bisect_right(self._keys_tuple(), key_slice))
+
+    def find_children(self, key_slices) -> List[int]:
+        """Child pagenos for a whole batch of key slices.
+
+        One decode of the node serves every needle, and the per-needle
+        work is a bisect plus a child read with all the attribute
+        lookups hoisted out of the loop.
+        """
+        keys = self._keys_tuple()
+        search = bisect_right
+        child = self.child_pageno
+        return [child(search(keys, k)) for k in key_slices]
+
+    def pack(self) -> bytes:
+        """The page image. The node *is* its page, so this is one copy."""
+        return bytes(self._buf)
+
+    @classmethod
+    def from_page(cls, page_data):
+        """Wrap a page buffer without unpacking it.
+
+        Mutable buffers (bytearray, writable memoryview) are adopted
+        as-is; immutable ones are copied once so the node stays
+        writable.
+        """
+        if page_data[0] != cls.PAGE_TYPE:
+            raise ValueError(f"not an interior page: type {page_data[0]:#x}")
+        buf = page_data
+        if isinstance(buf, bytes) or (
+            isinstance(buf, memoryview) and buf.readonly
+        ):
+            buf = bytearray(buf)
+        return cls(buf=buf)
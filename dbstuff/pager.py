@@ -20,16 +20,20 @@
 
 from abc import ABC, abstractmethod
 from dbstuff.util import length_prefix, ReadableBuffer, WriteableBuffer
+import mmap
 import os
-from struct import Struct, unpack_from
+from struct import Struct
 from typing import AnyStr, BinaryIO, Optional, Tuple, Union
 
-from dbstuff.cache import LRUCache
-
 
 # DREAM: In some future faraway dream world this is configurable instead of hard coded.
 PAGESIZE = 0x1000
 
+# precompiled structs for the small header fields, so hot paths never
+# re-parse a format string.
+_U32 = Struct("!I")
+_U64 = Struct("!Q")
+
 
 class Page(ABC):
     STRUCT: Struct
@@ -48,7 +52,9 @@ class Page(ABC):
                 f"{len(data)} instead of {PAGESIZE}"
             )
 
-        fields = cls.STRUCT.unpack(data)
+        # unpack_from accepts any buffer (memoryview, bytearray, mmap)
+        # so callers don't have to copy a page into bytes first.
+        fields = cls.STRUCT.unpack_from(data, 0)
         if fields[0] != cls.MAGIC:
             raise ValueError(f"{cls.__name__} has incorrect magic number")
         return fields
@@ -101,9 +107,10 @@ class OverflowPage(Page):
     """
 
     MAGIC = b"oVeRfLoW"
-    STRUCT = Struct("! 8s I 4084x")
+    STRUCT = Struct("! 8s I 4084s")
+    HEADER = Struct("! 8s I")
     # this is the size of the data portion of an overflow page
-    HEADERSIZE = 12
+    HEADERSIZE = HEADER.size
     DATASIZE = PAGESIZE - HEADERSIZE
 
     def __init__(self, next_overflow_pageno, overflow_data):
@@ -111,11 +118,32 @@ class OverflowPage(Page):
         self.next_overflow_pageno = next_overflow_pageno
         self.overflow_data = overflow_data
 
+    @classmethod
+    def from_page(cls, data: ReadableBuffer):
+        """Parse the header and keep a zero-copy view of the data region.
+
+        Only the fixed header goes through struct; overflow_data is a
+        memoryview into `data`, so when `data` is a writable buffer
+        (such as one from `Pager.page_view`) writes through the page
+        land directly in the mapping.
+        """
+        if len(data) != PAGESIZE:
+            raise ValueError(
+                f"{cls.__name__} data has incorrect length: "
+                f"{len(data)} instead of {PAGESIZE}"
+            )
+        fields = cls.HEADER.unpack_from(data, 0)
+        if fields[0] != cls.MAGIC:
+            raise ValueError(f"{cls.__name__} has incorrect magic number")
+        return cls(*fields[1:], memoryview(data)[cls.HEADERSIZE :])
+
     def pack(self) -> bytes:
+        # struct's `s` field wants bytes; overflow_data is a memoryview
+        # after a zero-copy from_page, so convert before packing.
         return self.STRUCT.pack(
             self.MAGIC,
             self.next_overflow_pageno,
-            self.overflow_data,
+            bytes(self.overflow_data),
         )
 
     def pack_into(self, buffer: WriteableBuffer, offset: int):
@@ -124,7 +152,7 @@ class OverflowPage(Page):
             offset,
             self.MAGIC,
             self.next_overflow_pageno,
-            self.overflow_data,
+            bytes(self.overflow_data),
         )
 
     def read_start(self, offset: int) -> Tuple[bytes, int]:
@@ -144,7 +172,7 @@ class OverflowPage(Page):
         if offset >= self.DATASIZE - 4:
             raise ValueError("offset too close to end of overflow page")
 
-        size = unpack_from("!I", self.overflow_data, offset)[0]
+        size = _U32.unpack_from(self.overflow_data, offset)[0]
 
         # advance over the size data
         offset += 4
@@ -219,7 +247,8 @@ class ZeroPage(OverflowPage):
 
     MAGIC = b"\xabZEROPG\xcd"
     STRUCT = Struct("! 8s I I I I H 4070s")
-    HEADERSIZE = 26
+    HEADER = Struct("! 8s I I I I H")
+    HEADERSIZE = HEADER.size
     DATASIZE = PAGESIZE - HEADERSIZE
 
     def __init__(
@@ -232,9 +261,9 @@ class ZeroPage(OverflowPage):
         overflow_data=None,
     ):
         if overflow_data is None:
-            self.overflow_data = bytearray(4074)
-        else:
-            self.overflow_data = bytearray(overflow_data)
+            overflow_data = bytearray(self.DATASIZE)
+        # whatever buffer we're handed is used as-is; copying it into a
+        # bytearray here would defeat from_page's zero-copy view.
         super().__init__(next_overflow_pageno, overflow_data)
         self.root_pageno = root_pageno
         self.next_free_pageno = next_free_pageno
@@ -250,7 +279,7 @@ class ZeroPage(OverflowPage):
             self.next_overflow_pageno,
             self.current_overflow_pageno,
             self.current_overflow_offset,
-            self.overflow_data,
+            bytes(self.overflow_data),
         )
 
     def pack_into(self, buffer: WriteableBuffer, offset: int):
@@ -263,7 +292,7 @@ class ZeroPage(OverflowPage):
             self.next_overflow_pageno,
             self.current_overflow_pageno,
             self.current_overflow_offset,
-            self.overflow_data,
+            bytes(self.overflow_data),
         )
 
     # TODO: we need to add the read/write methods from overflow page to this page.
@@ -298,90 +327,172 @@ class Pager:
     assert PAGE_FORMAT.size == PAGESIZE
 
     @staticmethod
-    def open_file(filepath: Union[AnyStr, os.PathLike]):
+    def open_file(filepath: Union[AnyStr, os.PathLike], random_access=False):
         if os.path.exists(filepath):
             mode = "r+b"
         else:
             mode = "w+b"
-        return Pager(open(filepath, mode))
+        return Pager(open(filepath, mode), random_access=random_access)
 
-    def __init__(self, file: BinaryIO):
+    def __init__(self, file: BinaryIO, random_access=False):
         """Create a new pager for `file`.
 
         `file` should either be blank or have a zero page.
         Anything else is an error.
+
+        The file is mapped into memory: page reads and writes are plain
+        slicing on the mapping instead of a seek syscall plus a read or
+        write syscall per page.
+
+        Pass `random_access=True` for workloads with little temporal
+        locality: the mapping is advised MADV_RANDOM, so the kernel
+        skips readahead and drops cold pages sooner instead of letting
+        this file crowd the page cache.
         """
         if file.closed or not (file.readable() and file.writable()):
             raise ValueError(
                 "Pager requires a file that is open, readable, and writeable"
             )
         self.file = file
-        if self._seek_end() == 0:
+        if os.fstat(file.fileno()).st_size == 0:
             # blank file, create zero page.
             page = self.PAGE_FORMAT.pack(self.ZERO_MAGIC, 0)
             file.write(page)
-
-        self._read_zero_page()
-        self.cache = LRUCache(maxsize=32)
-
-    def _seek_end(self) -> int:
-        """Seek to the end of the file and return the position."""
-        return self.file.seek(0, os.SEEK_END)
-
-    def _seek_page(self, pageno: int):
-        """Seek to the page given by `pageno`."""
-        offset = pageno * self.PAGESIZE
-        end = self._seek_end()
-        if offset + self.PAGESIZE > end:
+            file.flush()
+
+        self._mm = mmap.mmap(file.fileno(), 0)
+        if random_access and hasattr(mmap, "MADV_RANDOM"):
+            # madvise and the MADV_* constants are platform-dependent.
+            self._mm.madvise(mmap.MADV_RANDOM)
+        self._random_access = random_access
+        # the on-disk free chain is walked once here into a plain
+        # in-memory stack; frees and allocs then touch no pages until
+        # the chain is materialized again on sync/close.
+        self._free_stack = []
+        self._load_free_chain(self._read_zero_page())
+        # reusable buffer for building page images, so the bookkeeping
+        # paths don't allocate a fresh 4 KiB bytes object per write.
+        self._scratch = bytearray(PAGESIZE)
+        # pagenos written since the last sync.
+        self._dirty = set()
+
+    def _remap(self, new_size: int):
+        """Grow the file to `new_size` bytes and extend the mapping."""
+        os.ftruncate(self.file.fileno(), new_size)
+        self._mm.resize(new_size)
+        if self._random_access and hasattr(mmap, "MADV_RANDOM"):
+            # advice doesn't reliably survive an mremap; reapply.
+            self._mm.madvise(mmap.MADV_RANDOM)
+
+    def _page_offset(self, pageno: int) -> int:
+        """Byte offset of `pageno`, bounds-checked against the mapping."""
+        # reject negative pagenos explicitly: a negative offset would
+        # hit Python's negative-slice semantics on the mmap and silently
+        # read or corrupt a page counted from the end of the file.
+        if pageno < 0:
+            raise ValueError("pageno out of bounds")
+        offset = pageno * PAGESIZE
+        if offset + PAGESIZE > len(self._mm):
             raise ValueError("pageno out of bounds")
-        self.file.seek(offset)
+        return offset
 
-    def _read_zero_page(self):
-        self._seek_page(0)
-        data = self.PAGE_FORMAT.unpack(self.file.read(self.PAGESIZE))
+    def _read_zero_page(self) -> int:
+        data = self.PAGE_FORMAT.unpack_from(self._mm, 0)
         if data[0] != self.ZERO_MAGIC:
             raise RuntimeError("Bad MAGIC on zero page")
-        self.next_free_pageno = data[1]
+        return data[1]
+
+    def _load_free_chain(self, head: int):
+        """Walk the on-disk free chain into the in-memory stack."""
+        chain = []
+        pageno = head
+        while pageno != 0:
+            data = self.PAGE_FORMAT.unpack_from(
+                self._mm, self._page_offset(pageno)
+            )
+            if data[0] != self.FREE_MAGIC:
+                raise RuntimeError("invalid free page format: bad magic")
+            chain.append(pageno)
+            pageno = data[1]
+        # reversed so pops come off in chain order, head first.
+        self._free_stack = chain[::-1]
+
+    @property
+    def next_free_pageno(self) -> int:
+        """The page the next alloc will reuse; 0 when there is none."""
+        return self._free_stack[-1] if self._free_stack else 0
 
-    def read_page(self, pageno: int, use_cache=True) -> bytes:
+    def read_page(self, pageno: int) -> bytes:
         """Fetch a page from the file.
 
+        There is deliberately no cache layer here: every read comes out
+        of the mapping, so the OS page cache already serves hot pages
+        and a Python-side LRU on top of it would just hold duplicates.
+
         :param pageno: The page number to fetch.
         :type pageno: int
         :returns: The contents of the page as a bytes object.
         :rtype: bytes
         """
 
-        if use_cache:
-            data = self.cache.get(pageno)
-            if data is not None:
-                return data
-
-        self._seek_page(pageno)
-        data = self.file.read(self.PAGESIZE)
-        assert len(data) == self.PAGESIZE
+        offset = self._page_offset(pageno)
+        return self._mm[offset : offset + PAGESIZE]
 
-        self.cache.set(pageno, data)
+    def page_view(self, pageno: int) -> memoryview:
+        """A zero-copy view of a page in the mapping.
 
-        return data
+        Views must be short-lived: a live exported view blocks the
+        `mmap.resize` that allocating a fresh page performs.
+        """
+        offset = self._page_offset(pageno)
+        return memoryview(self._mm)[offset : offset + PAGESIZE]
 
     def write_page(self, pageno: int, data: bytes):
         """Write new page data.
 
+        Writes land in the mapping (and so the OS page cache); call
+        `sync` to force them to disk.
+
         :param pageno: The pageno to write to.
         :type pageno: int
         :param data: The data to write.
         :type data: bytes
         """
 
-        assert len(data) == self.PAGESIZE
+        if len(data) != PAGESIZE:
+            raise ValueError("page data must be exactly PAGESIZE bytes")
+        offset = self._page_offset(pageno)
+        self._mm[offset : offset + PAGESIZE] = data
+        self._dirty.add(pageno)
+
+    def read_pages(self, start: int, count: int) -> bytes:
+        """Fetch `count` contiguous pages as one buffer.
 
-        self._seek_page(pageno)
-        count = self.file.write(data)
-        if count != self.PAGESIZE:
-            raise IOError("Incomplete page write")
-        self.file.flush()
-        self.cache.delete(pageno)
+        The whole batch is a single slice of the mapping, so it costs
+        one bounds check and one copy regardless of `count`.
+        """
+        if count < 1:
+            raise ValueError("count must be positive")
+        offset = self._page_offset(start)
+        end = offset + count * PAGESIZE
+        if end > len(self._mm):
+            raise ValueError("pageno out of bounds")
+        return self._mm[offset:end]
+
+    def write_pages(self, start: int, data: bytes):
+        """Write one or more contiguous pages in a single operation.
+
+        `data` must be a whole number of pages.
+        """
+        count, rem = divmod(len(data), PAGESIZE)
+        if rem or count == 0:
+            raise ValueError("data must be a whole number of pages")
+        offset = self._page_offset(start)
+        end = offset + len(data)
+        if end > len(self._mm):
+            raise ValueError("pageno out of bounds")
+        self._mm[offset:end] = data
+        self._dirty.update(range(start, start + count))
 
     def alloc_page(self) -> int:
         """Allocate a new page.
@@ -390,80 +501,110 @@ class Pager:
         :rtype: int
         """
 
-        if self.next_free_pageno != 0:
-            # we have a previously allocated page we can use.
-            pageno = self.next_free_pageno
-            data = self.PAGE_FORMAT.unpack(self.read_page(pageno))
-            if data[0] != self.FREE_MAGIC:
-                raise RuntimeError("invalid free page format: bad magic")
-            self._write_next_free_pageno(data[1])
-        else:
-            pageno = self._alloc_fresh_page()
-
-        return pageno
+        if self._free_stack:
+            # reuse a previously freed page: one list pop, no IO. the
+            # chain was validated when it was loaded.
+            return self._free_stack.pop()
+        return self._alloc_fresh_page()
 
     def _alloc_fresh_page(self) -> int:
         """Allocate a fresh page at the end of the file."""
 
-        # find the end of the file
-        next_page = self._seek_end()
+        # find the end of the mapping
+        next_page = len(self._mm)
 
         # align with page boundary
-        if next_page % self.PAGESIZE != 0:
-            next_page = (next_page & ~(self.PAGESIZE - 1)) + self.PAGESIZE
-            assert next_page % self.PAGESIZE == 0
+        if next_page % PAGESIZE != 0:
+            next_page = (next_page & ~(PAGESIZE - 1)) + PAGESIZE
+            assert next_page % PAGESIZE == 0
             # next_page is an offset not a pageno!!!
-            self.file.seek(next_page)
 
-        # write a blank page
-        self.file.write(b"\x00" * self.PAGESIZE)
+        # ftruncate extends the file with zeros, so the new page is
+        # already blank; no need to write 4 KiB of zeros over it.
+        self._remap(next_page + PAGESIZE)
 
         # return the page number
-        return next_page // self.PAGESIZE
+        return next_page // PAGESIZE
 
     def free_page(self, pageno: int):
-        """Free the given page."""
+        """Free the given page.
+
+        Pure memory operation: the pageno is pushed on the free stack
+        and no header is written until the chain is materialized on
+        sync/close. A free/alloc cycle on the same page costs two list
+        operations and zero IO.
+        """
+        self._free_stack.append(pageno)
 
-        # clear the cache
-        self.cache.delete(pageno)
+    def _flush_free_list(self):
+        """Materialize the in-memory free stack as the on-disk chain.
 
-        # clear the page and write the pointer to the next free page.
-        data = self.PAGE_FORMAT.pack(self.FREE_MAGIC, self.next_free_pageno)
-        self.write_page(pageno, data)
-        # commit the next free page to the zero page.
-        self._write_next_free_pageno(pageno)
+        The stack is walked tail-first so each page's header points at
+        the page freed before it; the head lands in the zero page as an
+        in-place 8-byte patch.
+        """
+        next_pageno = 0
+        for pageno in self._free_stack:
+            self.PAGE_FORMAT.pack_into(
+                self._scratch, 0, self.FREE_MAGIC, next_pageno
+            )
+            self.write_page(pageno, self._scratch)
+            next_pageno = pageno
+        _U64.pack_into(self._mm, len(self.ZERO_MAGIC), next_pageno)
+        self._dirty.add(0)
+
+    def sync(self):
+        """Flush dirty pages (and the free chain) out to the file.
 
-    def _write_next_free_pageno(self, pageno: int):
-        """Commit the first free pageno to the zero page."""
-        data = self.PAGE_FORMAT.pack(self.ZERO_MAGIC, pageno)
-        self.write_page(0, data)
-        self.next_free_pageno = pageno
+        Only pages written since the last sync are flushed, coalesced
+        into contiguous runs so each run is a single msync call.
+        """
+        self._flush_free_list()
+        if not self._dirty:
+            return
+        pages = sorted(self._dirty)
+        self._dirty.clear()
+        start = prev = pages[0]
+        for pageno in pages[1:]:
+            if pageno != prev + 1:
+                self._mm.flush(
+                    start * PAGESIZE, (prev - start + 1) * PAGESIZE
+                )
+                start = pageno
+            prev = pageno
+        self._mm.flush(
+            start * PAGESIZE, (prev - start + 1) * PAGESIZE
+        )
 
     def close(self):
         """Close the pager and its underlying file object."""
-        self.file.flush()
+        self.sync()
+        self._mm.close()
         self.file.close()
 
     def read_overflow(self, pageno: int, offset: int) -> bytes:
         """Read the overflow data that begins at pageno and offset."""
-        # FIXME: use buffers instead of appending `bytes` objects.
 
-        # fetch the overflow page
-        page = OverflowPage.from_page(self.get_page(pageno))
-        data = bytes()
+        # fetch the overflow page, parsed straight off the mapping
+        page = OverflowPage.from_page(self.page_view(pageno))
 
         # read everything we can from the first page.
         current_data, togo = page.read_start(offset)
-        data += current_data
+
+        # the total size is known after read_start, so fill a single
+        # right-sized buffer instead of collecting chunks and joining.
+        pos = len(current_data)
+        out = bytearray(pos + togo)
+        out[:pos] = current_data
 
         while togo > 0:
             # we still have data to read, so fetch the next overflow page.
             page = OverflowPage.from_page(
-                self.get_page(page.next_overflow_pageno)
+                self.page_view(page.next_overflow_pageno)
             )
             # continue reading the data from the start of the next overflow page.
             current_data, togo = page.read_continue(0, togo)
-            # append new data
-            data += current_data
+            out[pos : pos + len(current_data)] = current_data
+            pos += len(current_data)
 
-        return data
+        return bytes(out)
@@ -2,9 +2,9 @@
 """
 
 from array import ArrayType
-from dataclasses import dataclass, field
+from functools import total_ordering
 from mmap import mmap
-import struct
+from struct import Struct
 from threading import Condition, Lock
 from typing import Generic, Tuple, TypeVar, Union
 
@@ -17,74 +17,148 @@ K = TypeVar("K")
 V = TypeVar("V")
 
 
-@dataclass(order=True)
+@total_ordering
 class Entry(Generic[K, V]):
-    """A simple dataclass that compares on the key and ignores the value.
+    """A key/value pair that compares on the key and ignores the value.
+
+    A plain __slots__ class with hand-written comparisons: no
+    per-instance __dict__, and `a < b` is a single key compare instead
+    of the tuple pack the old dataclass-generated dunders did on every
+    call. total_ordering derives the remaining comparisons from the two
+    hand-written ones.
 
     >>> Entry(1, 2) == Entry(1, 3)
     True
+    >>> Entry(1, 2) == 5
+    False
     >>> sorted([Entry(2, 1000), Entry(1, {}), Entry (3, None)])
     [Entry(key=1, value={}), Entry(key=2, value=1000), Entry(key=3, value=None)]
     """
 
-    key: K = field(hash=True)
-    value: V = field(compare=False, hash=False)
+    __slots__ = ("key", "value")
+
+    def __init__(self, key: K, value: V):
+        self.key = key
+        self.value = value
+
+    def __lt__(self, other: "Entry") -> bool:
+        if not isinstance(other, Entry):
+            return NotImplemented
+        return self.key < other.key
+
+    def __eq__(self, other: "Entry") -> bool:
+        if not isinstance(other, Entry):
+            return NotImplemented
+        return self.key == other.key
+
+    def __repr__(self) -> str:
+        return f"Entry(key={self.key!r}, value={self.value!r})"
+
+    # mutable and compared by key only, like the eq=True dataclass was.
+    __hash__ = None
 
 
 def split_list(x: list) -> Tuple[list, list]:
-    """Split a list.
+    """Split a list in two, reusing `x` as the left half.
 
-    For an odd-length list, the median goes to the right.
+    For an odd-length list, the median goes to the right. Only the
+    right half is a new list; the left half is `x` itself, truncated in
+    place, so a split copies half the elements instead of all of them.
 
-    :param x: the list to split
+    :param x: the list to split (mutated: keeps only the left half)
     :type x: list
     :return: A tuple containing each half of the list
     :rtype: Tuple[list]
 
+    >>> x = [1, 2, 3, 4, 5]
+    >>> split_list(x)
+    ([1, 2], [3, 4, 5])
+    >>> x
+    [1, 2]
     >>> split_list([1, 2, 3, 4])
     ([1, 2], [3, 4])
-    >>> split_list([1, 2, 3, 4, 5])
+    """
+
+    return split_list_at(x, len(x) // 2)
+
+
+def split_list_at(x: list, mid: int) -> Tuple[list, list]:
+    """Split a list at a caller-supplied index, reusing `x` as the left
+    half (same mutation contract as `split_list`).
+
+    For callers that already know the midpoint -- a fixed node order
+    pins it -- this skips computing `len(x) // 2` on every split.
+
+    >>> split_list_at([1, 2, 3, 4, 5], 2)
     ([1, 2], [3, 4, 5])
     """
 
-    median = len(x) // 2
-    return x[:median], x[median:]
+    right = x[mid:]
+    del x[mid:]
+    return x, right
+
+
+_U32 = Struct("!I")
 
 
 def length_prefix(data: ReadableBuffer) -> ReadableBuffer:
-    """Prefix binary data with a 32 bit length counter."""
+    """Prefix binary data with a 32 bit length counter.
+
+    The counter is packed with a precompiled Struct and the data is
+    slice-copied after it, instead of compiling a per-size format
+    string on every call.
+    """
     size = len(data)
-    return struct.pack(f"!I{size}s", size, data)
+    out = bytearray(4 + size)
+    _U32.pack_into(out, 0, size)
+    out[4:] = data
+    return out
 
 
 class ReadWriteLock:
+    """Any number of concurrent readers, or exactly one writer.
+
+    A single Condition guards a reader count and a writer flag, so
+    taking the lock is one mutex acquire instead of the two the old
+    double-lock scheme needed on every read. Writers are preferred:
+    new readers also wait while a writer is queued, so a steady stream
+    of readers can't starve a writer indefinitely.
+    """
+
     def __init__(self):
-        self._read_lock = Lock()
-        self._write_lock = Condition(Lock())
+        self._cond = Condition(Lock())
         self._reader_count = 0
+        self._writer_active = False
+        self._writers_waiting = 0
         self.read_access = _ReaderContext(self)
         self.write_access = _WriterContext(self)
 
     def acquire_read(self):
-        with self._read_lock:
-            with self._write_lock:
-                self._reader_count += 1
+        with self._cond:
+            while self._writer_active or self._writers_waiting:
+                self._cond.wait()
+            self._reader_count += 1
 
     def release_read(self):
-        with self._write_lock:
+        with self._cond:
             self._reader_count -= 1
             if not self._reader_count:
-                self._write_lock.notify()
+                self._cond.notify_all()
 
     def acquire_write(self):
-        self._read_lock.acquire()
-        self._write_lock.acquire()
-        self._write_lock.wait_for(lambda: self._reader_count == 0)
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer_active or self._reader_count:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer_active = True
 
     def release_write(self):
-        self._write_lock.notify()
-        self._write_lock.release()
-        self._read_lock.release()
+        with self._cond:
+            self._writer_active = False
+            self._cond.notify_all()
 
 
 class _ReaderContext:
@@ -1,24 +1,124 @@
 import pytest
-from random import shuffle
+from random import Random
 from dbstuff.memory import BPlusTree
 
 
-@pytest.mark.parametrize("order", range(3, 20))
-def test_tree_random(order):
-    r = list(range(order * 10))
-    shuffle(r)
+def permutation(n, seed=0):
+    """A seeded shuffle of range(n).
+
+    Computed once and reused across the insert/lookup/delete phases
+    instead of re-shuffling between them, and deterministic so a
+    failing order reproduces.
+    """
+    r = list(range(n))
+    Random(seed).shuffle(r)
+    return r
+
 
+@pytest.fixture(scope="module", params=range(3, 20))
+def populated_tree(request):
+    """A tree of each order holding order*10 random-inserted keys.
+
+    Built once per order and shared by the lookup and delete tests, so
+    the insert phase isn't repeated per test. Definition order matters:
+    test_delete runs after test_lookup and leaves the tree empty.
+    """
+    order = request.param
     bt = BPlusTree(order)
+    keys = permutation(order * 10)
+    for i in keys:
+        bt[i] = i
+    return bt, keys
+
+
+def test_lookup(populated_tree):
+    bt, keys = populated_tree
+    for i in keys:
+        assert bt[i] == i
+
+
+def test_delete(populated_tree):
+    bt, keys = populated_tree
+    for i in keys:
+        del bt[i]
+        assert bt[i] is None
+
+
+@pytest.mark.parametrize("order", range(3, 20))
+def test_bulk_load(order):
+    n = order * 10
+    bt = BPlusTree(order)
+    bt.bulk_load((i, -i) for i in range(n))
+
+    for i in range(n):
+        assert bt[i] == -i
+    assert n not in bt
+
+    for i in permutation(n):
+        del bt[i]
+        assert bt[i] is None
+
+
+def test_bulk_load_awkward_tail():
+    # 13 pairs at order 4 leave an interior remainder of 5 children
+    # with cap=4 and lo=3: no cut into two minimum-occupancy nodes
+    # exists, so one interior node comes out undersized. Lookups and
+    # deletes must cope with that shape.
+    bt = BPlusTree(4)
+    bt.bulk_load((i, -i) for i in range(13))
+
+    for i in range(13):
+        assert bt[i] == -i
+
+    for i in permutation(13):
+        del bt[i]
+        assert bt[i] is None
+
+
+def test_update():
+    bt = BPlusTree(5)
+    # empty tree: update takes the bulk-load path.
+    bt.update((i, i) for i in range(50))
+    for i in range(50):
+        assert bt[i] == i
+
+    # non-empty tree: per-key inserts, later duplicates win.
+    bt.update([(3, "x"), (60, 60), (3, "y")])
+    assert bt[3] == "y"
+    assert bt[60] == 60
+    assert bt[4] == 4
+
+
+def test_tree_typed_keys():
+    r = permutation(100)
+
+    bt = BPlusTree(8, key_typecode="q")
+    for i in r:
+        bt[i] = str(i)
+
+    for i in r:
+        assert bt[i] == str(i)
+
+    for i in r:
+        del bt[i]
+        assert bt[i] is None
+
+
+def test_specialized_class():
+    from dbstuff.memory import make_bplustree_class
+
+    cls = make_bplustree_class(8)
+    assert cls is make_bplustree_class(8)
+
+    r = permutation(80)
 
+    bt = cls()
     for i in r:
         bt[i] = i
 
-    shuffle(r)
     for i in r:
-        x = bt[i]
-        assert x == i
+        assert bt[i] == i
 
-    shuffle(r)
     for i in r:
         del bt[i]
         assert bt[i] is None
@@ -0,0 +1,66 @@
+from dbstuff.paged import InteriorNode, cmp_slices, slice_key
+
+
+def test_slice_key():
+    assert list(slice_key("")) == []
+    assert len(slice_key("x" * 8)) == 1
+    assert len(slice_key("x" * 9)) == 2
+
+
+def test_cmp_slices():
+    a = slice_key("apple")
+    b = slice_key("banana")
+    assert cmp_slices(a, b) == -1
+    assert cmp_slices(b, a) == 1
+    assert cmp_slices(a, slice_key("apple")) == 0
+    # a shared prefix orders by the tail, like the underlying strings.
+    assert cmp_slices(slice_key("apple"), slice_key("applesauce")) == -1
+
+
+def test_cmp_slices_matches_key_order():
+    keys = ["", "a", "aa", "ab", "abcdefgh", "abcdefghi", "b"]
+    sliced = [slice_key(k) for k in keys]
+    for i, a in enumerate(sliced):
+        for j, b in enumerate(sliced):
+            expected = (keys[i] > keys[j]) - (keys[i] < keys[j])
+            assert cmp_slices(a, b) == expected
+
+
+def test_interior_node_round_trip():
+    node = InteriorNode(key_slices=[10, 20, 30], child_pagenos=[1, 2, 3, 4])
+    assert node.nkeys == 3
+    assert list(node.key_slices) == [10, 20, 30]
+    assert list(node.child_pagenos) == [1, 2, 3, 4]
+
+    page = node.pack()
+    assert len(page) == 4096
+    copy = InteriorNode.from_page(page)
+    assert copy.nkeys == 3
+    assert list(copy.key_slices) == [10, 20, 30]
+    assert list(copy.child_pagenos) == [1, 2, 3, 4]
+    # immutable input is copied, so the copy stays writable.
+    copy.set_key_slice(0, 5)
+    assert node.key_slice(0) == 10
+
+
+def test_find_child():
+    node = InteriorNode(key_slices=[10, 20, 30], child_pagenos=[1, 2, 3, 4])
+    # keys equal to a separator descend right, like bisect_right.
+    assert node.find_child(5) == 1
+    assert node.find_child(10) == 2
+    assert node.find_child(15) == 2
+    assert node.find_child(30) == 4
+    assert node.find_children([5, 10, 15, 30]) == [1, 2, 2, 4]
+
+
+def test_find_child_cache_invalidation():
+    node = InteriorNode(key_slices=[10, 20, 30], child_pagenos=[1, 2, 3, 4])
+    assert node.find_child(7) == 1  # populates the key cache
+
+    # editing a key must drop the cached decode.
+    node.set_key_slice(0, 5)
+    assert node.find_child(7) == 2
+
+    # so must changing the key count.
+    node.nkeys = 1
+    assert node.find_child(25) == 2
@@ -44,12 +44,35 @@ def test_write_oob_pageno(new_pager):
         new_pager.write_page(1, BLANK_PAGE)
 
 
+def test_negative_pageno(new_pager):
+    # a negative pageno must not wrap around to a page near the end of
+    # the file via negative-slice semantics on the mapping.
+    for _ in range(4):
+        new_pager.alloc_page()
+    with pytest.raises(ValueError, match="pageno out of bounds"):
+        new_pager.read_page(-2)
+    with pytest.raises(ValueError, match="pageno out of bounds"):
+        new_pager.write_page(-2, BLANK_PAGE)
+    with pytest.raises(ValueError, match="pageno out of bounds"):
+        new_pager.read_pages(-2, 2)
+
+
+def test_write_wrong_length(new_pager):
+    pageno = new_pager.alloc_page()
+    with pytest.raises(ValueError, match="PAGESIZE"):
+        new_pager.write_page(pageno, b"\xff")
+    with pytest.raises(ValueError, match="PAGESIZE"):
+        new_pager.write_page(pageno, BLANK_PAGE + b"\x00")
+
+
 def test_free_page(new_pager):
     pageno = new_pager.alloc_page()
     assert pageno == 1
     new_pager.write_page(pageno, b"\x88" * Pager.PAGESIZE)
     new_pager.free_page(pageno)
     assert new_pager.next_free_pageno == 1
+    # freeing is a memory-only operation; the chain hits the pages on sync.
+    new_pager.sync()
     data = new_pager.read_page(new_pager.next_free_pageno)
     # check the magic number that marks this as a free page
     # since this is the only free page, the next_free_page pointer should be 0.